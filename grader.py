@@ -1,42 +1,118 @@
 import os
 import re
-import json
+import hashlib
+import functools
 import argparse
-from typing import Dict, List, Tuple, Optional, Any
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Any
 from tqdm import tqdm
+try:
+    import re2 as fast_re  # google-re2: DFA-based, no backtracking
+except ImportError:
+    fast_re = re
+import orjson
 import pandas as pd
 from colorama import init, Fore, Style
-from openai import OpenAI
-from anthropic import Anthropic
-from groq import Groq
-from pdfminer.high_level import extract_text
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 
 
 # Initialize colorama for colored output
 init(autoreset=True)
 
+# Precompiled patterns for the per-submission parsing and scanning paths
+# Deletes whitespace (everything str.isspace() accepts, all of which is below U+3001), stars and hashes
+_CLEAN_RESPONSE_TABLE = str.maketrans('', '', '*#' + ''.join(c for c in map(chr, range(0x3001)) if c.isspace()))
+_NAME_CLEAN = re.compile(r'[^\w\s]')
+_CODE_START = re.compile(r'^[^\S\n]*(?:import|public class)', re.MULTILINE)
+_LINE_COMMENT = re.compile(r'^\s*//+\s?', re.MULTILINE)
+_BLOCK_COMMENT_DELIMS = re.compile(r'/\*|\*/')
+_BLOCK_COMMENT_STAR = re.compile(r'^\s*\*\s?', re.MULTILINE)
+_BLANK_LINE = re.compile(r'^\s*$\n', re.MULTILINE)
+_BRACE_RE = re.compile(r'[{}]')
+# Lines (with their newline, as readlines() returns them) that start with a print call
+_PRINT_LINE = re.compile(r'^System\.out\.println\(.*\n?', re.MULTILINE)
+# The comment/string pattern is regular, so compile it with RE2 when available.
+# Flags are inlined because RE2 does not accept the re module's flag constants.
+_COMMENT_STRING_RE = fast_re.compile('(?m)' + '|'.join([
+    r'//.*?$',              # Line comments
+    r'/\*[\s\S]*?\*/',      # Block comments
+    r'"(?:\\.|[^"\\])*"',   # Double-quoted strings
+    r"'(?:\\.|[^'\\])*'",   # Single-quoted chars
+]))
+
 def load_config(config_path: str = "config.json") -> Dict[str, Any]:
-    with open(config_path, "r") as f:
-        return json.load(f)
+    with open(config_path, "rb") as f:
+        return orjson.loads(f.read())
 
 config = load_config()
 
+RESULT_COLUMNS = ['Name', 'Score', 'Confidence', 'Comments']
+
+# Maximum response length requested from Anthropic models
+MAX_TOKENS = 4096
+
 def initialize_clients(config: Dict[str, Any]) -> Dict[str, Any]:
+    # Provider SDKs are slow to import, so only load the ones that have an API key configured
     clients = {}
-    if 'openai' in config['api_keys']:
+    if config['api_keys'].get('openai'):
+        from openai import OpenAI
         clients['openai'] = OpenAI(api_key=config['api_keys']['openai'])
-    if 'anthropic' in config['api_keys']:
+    if config['api_keys'].get('anthropic'):
+        from anthropic import Anthropic
         clients['anthropic'] = Anthropic(api_key=config['api_keys']['anthropic'])
-    if 'groq' in config['api_keys']:
+    if config['api_keys'].get('groq'):
+        from groq import Groq
         clients['groq'] = Groq(api_key=config['api_keys']['groq'])
     return clients
 
-clients = initialize_clients(config)
+@functools.lru_cache(maxsize=None)
+def get_clients() -> Dict[str, Any]:
+    """Build the provider clients on first use, so importing this module (or --help) stays fast."""
+    return initialize_clients(config)
+
+def get_client(clients: Dict[str, Any], provider: str) -> Any:
+    """Look up a provider's client, with a clear error if it has no API key configured."""
+    if provider not in clients:
+        raise ValueError(f"No {provider} API key is configured in config.json")
+    return clients[provider]
+
+@functools.lru_cache(maxsize=None)
+def open_cache(cache_dir: str) -> Any:
+    """Open (once per directory) the diskcache store at cache_dir."""
+    import diskcache
+    return diskcache.Cache(cache_dir)
+
+def get_cache(config: Dict[str, Any]) -> Any:
+    """
+    On-disk cache of API responses and preprocessed submissions, so re-grading unchanged
+    submissions skips the API call and the per-file work. Opened on first use, in the
+    cache_dir of the given config.
+    """
+    return open_cache(config.get('cache_dir', '.llm_cache'))
 
 def color_print(text: str, color: str = Fore.WHITE, style: str = Style.NORMAL) -> None:
     """Print colored text to the console."""
     print(f"{style}{color}{text}")
 
+def extract_text(path_to_pdf: str) -> str:
+    """Extract the plain text of a PDF using PDFium, falling back to pypdf."""
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        from pypdf import PdfReader
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path_to_pdf).pages)
+
+    pdf = pdfium.PdfDocument(path_to_pdf)
+    try:
+        text = "\n".join(page.get_textpage().get_text_range() for page in pdf)
+    finally:
+        pdf.close()
+    # PDFium separates lines with CRLF
+    return text.replace('\r\n', '\n')
+
 def parse_assignment_pdf(path_to_pdf: str) -> Tuple[Optional[str], Optional[str]]:
     try:
         text = extract_text(path_to_pdf)
@@ -58,6 +134,7 @@ def parse_assignment_pdf(path_to_pdf: str) -> Tuple[Optional[str], Optional[str]
     color_print("PDF extraction complete.", Fore.GREEN)
     return assignment_name, assignment_prompt
 
+@functools.lru_cache(maxsize=16)
 def generate_system_prompt(assignment_name: str, assignment_prompt: str, scoring_sheet: str) -> str:
     """Generate the system prompt for the AI grader."""
     return f"""
@@ -85,51 +162,163 @@ CONFIDENCE:[score from 1-5 for the confidence you have in your given grade]
 '''
 """
 
-def call_api(clients: Dict[str, Any], model: str, system_prompt: str, user_prompt: str, config: Dict[str, Any]) -> str:
-    """Call the appropriate API based on the selected model."""
-    if model.startswith(("gpt", "o1")):
-        response = clients['openai'].chat.completions.create(
-            model=config['model_map'][model],
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=config['default_temperature']
-        )
-        return response.choices[0].message.content.strip()
-    elif model.startswith(("llama", "mixtral")):
-        response = clients['groq'].chat.completions.create(
+@functools.lru_cache(maxsize=16)
+def prompt_cache_key(system_prompt: str) -> str:
+    """Hash of the system prompt, computed once per distinct prompt rather than once per request."""
+    return hashlib.sha256(system_prompt.encode()).hexdigest()
+
+def cache_enabled(config: Dict[str, Any]) -> bool:
+    """Responses are only reusable when sampling is deterministic."""
+    return config.get('cache_enabled', True) and config['default_temperature'] == 0
+
+def is_cacheable_response(response: str) -> bool:
+    """
+    Only cache complete grades, so re-running can fix an empty, truncated or malformed response:
+    all three labels must be present and the score must parse.
+    """
+    cleaned_response = response.translate(_CLEAN_RESPONSE_TABLE)
+    if not all(label in cleaned_response for label in ('SCORE:', 'COMMENTS:', 'CONFIDENCE:')):
+        return False
+    return parse_ai_response(response)[0] != -100
+
+def response_cache_key(model: str, system_prompt: str, user_prompt: str, config: Dict[str, Any]) -> str:
+    """Hash everything that determines the API response into a cache key."""
+    # Use the resolved model id so remapping an alias to a new snapshot doesn't return stale grades
+    payload = {'m': config['model_map'][model], 's': system_prompt, 'u': user_prompt,
+               't': config['default_temperature'], 'max_tokens': MAX_TOKENS}
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+def is_rate_limit_error(e: BaseException) -> bool:
+    """Return True if the exception is an HTTP 429 from any of the provider SDKs."""
+    return getattr(e, 'status_code', None) == 429
+
+@retry(retry=retry_if_exception(is_rate_limit_error), wait=wait_exponential(multiplier=1, max=60),
+       stop=stop_after_attempt(6), reraise=True)
+def call_api(clients: Dict[str, Any], model: str, system_prompt: str, user_prompt: str, config: Dict[str, Any],
+             on_chunk: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Call the appropriate API based on the selected model.
+
+    The response is streamed, and on_chunk (if given) is called with each chunk of text as it arrives.
+    """
+    use_cache = cache_enabled(config)
+    if use_cache:
+        key = response_cache_key(model, system_prompt, user_prompt, config)
+        cached = get_cache(config).get(key)
+        if cached is not None:
+            return cached
+
+    chunks: List[str] = []
+    def add_chunk(chunk: Optional[str]) -> None:
+        if chunk:
+            chunks.append(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+
+    if model.startswith(("gpt", "o1", "llama", "mixtral")):
+        # OpenAI and Groq share the same chat completions interface
+        if model.startswith(("llama", "mixtral")):
+            client, extra = get_client(clients, 'groq'), {}
+        else:
+            # Route every request sharing this rubric to the same OpenAI prefix cache
+            # (sent as extra_body so SDK releases without a prompt_cache_key parameter still accept it)
+            client, extra = get_client(clients, 'openai'), {"extra_body": {"prompt_cache_key": prompt_cache_key(system_prompt)}}
+        stream = client.chat.completions.create(
             model=config['model_map'][model],
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=config['default_temperature']
+            temperature=config['default_temperature'],
+            stream=True,
+            **extra
         )
-        return response.choices[0].message.content.strip()
+        for chunk in stream:
+            if chunk.choices:
+                add_chunk(chunk.choices[0].delta.content)
     else:  # Assume Anthropic model
-        response = clients['anthropic'].messages.create(
+        with get_client(clients, 'anthropic').messages.stream(
             model=config['model_map'][model],
-            max_tokens=4096,
+            max_tokens=MAX_TOKENS,
             temperature=config['default_temperature'],
-            system=system_prompt,
+            # The system prompt is identical for every student, so let Anthropic cache its prefix
+            system=[{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}],
             messages=[{"role": "user", "content": user_prompt}]
-        )
-        return response.content[0].text.strip()
+        ) as stream:
+            for text in stream.text_stream:
+                add_chunk(text)
+
+    text = "".join(chunks).strip()
+    if use_cache and is_cacheable_response(text):
+        get_cache(config).set(key, text, expire=config.get('cache_ttl', 7 * 86400))
+    return text
+
+def call_api_batch(clients: Dict[str, Any], model: str, system_prompt: str, prompts: Dict[str, str], config: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Grade many user prompts with one Anthropic Message Batch.
+
+    prompts maps a custom id (at most 64 characters of [a-zA-Z0-9_-]) to its user prompt. Blocks
+    until the batch has ended and returns the response text for each id that succeeded.
+    """
+    if model.startswith(("gpt", "o1", "llama", "mixtral")):
+        raise ValueError(f"Batch mode is only supported for Anthropic models, not {model}")
+
+    use_cache = cache_enabled(config)
+    responses = {}
+    requests = []
+    for custom_id, user_prompt in prompts.items():
+        if use_cache:
+            cached = get_cache(config).get(response_cache_key(model, system_prompt, user_prompt, config))
+            if cached is not None:
+                responses[custom_id] = cached
+                continue
+        requests.append({
+            "custom_id": custom_id,
+            "params": {
+                "model": config['model_map'][model],
+                "max_tokens": MAX_TOKENS,
+                "temperature": config['default_temperature'],
+                "system": [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}],
+                "messages": [{"role": "user", "content": user_prompt}]
+            }
+        })
+    if not requests:
+        return responses
+
+    anthropic_client = get_client(clients, 'anthropic')
+    batch = anthropic_client.messages.batches.create(requests=requests)
+    color_print(f"Submitted batch {batch.id} with {len(requests)} requests, waiting for results...", Fore.CYAN)
+    while batch.processing_status != "ended":
+        time.sleep(config.get('batch_poll_interval', 30))
+        batch = anthropic_client.messages.batches.retrieve(batch.id)
+
+    for entry in anthropic_client.messages.batches.results(batch.id):
+        if entry.result.type != "succeeded":
+            continue
+        text = entry.result.message.content[0].text.strip()
+        responses[entry.custom_id] = text
+        if use_cache and is_cacheable_response(text):
+            key = response_cache_key(model, system_prompt, prompts[entry.custom_id], config)
+            get_cache(config).set(key, text, expire=config.get('cache_ttl', 7 * 86400))
+    return responses
 
 def parse_ai_response(response: str) -> Tuple[float, str, str]:
     # Remove all newlines, whitespace, and stars
-    cleaned_response = re.sub(r'[\n\s*#]', '', response)
-    
-    # Extract score, comments, and confidence using regex
-    score_match = re.search(r'SCORE:(.*?)COMMENTS:', cleaned_response)
-    comments_match = re.search(r'COMMENTS:(.*?)CONFIDENCE:', cleaned_response)
-    confidence_match = re.search(r'CONFIDENCE:(.*?)$', cleaned_response)
+    cleaned_response = response.translate(_CLEAN_RESPONSE_TABLE)
     
-    # Extract the matched groups or use empty string if not found
-    score = score_match.group(1) if score_match else ""
-    comments = comments_match.group(1) if comments_match else ""
-    confidence = confidence_match.group(1) if confidence_match else ""
+    # Extract score, comments, and confidence from between their labels, or use empty string if not found
+    score = comments = ""
+    _, found, rest = cleaned_response.partition('SCORE:')
+    if found:
+        value, found, _ = rest.partition('COMMENTS:')
+        if found:
+            score = value
+    _, found, rest = cleaned_response.partition('COMMENTS:')
+    if found:
+        value, found, _ = rest.partition('CONFIDENCE:')
+        if found:
+            comments = value
+    _, _, confidence = cleaned_response.partition('CONFIDENCE:')
     
     # Parse score into a float
     try:
@@ -139,60 +328,173 @@ def parse_ai_response(response: str) -> Tuple[float, str, str]:
     
     return score, comments, confidence
 
-def preprocess_student_submission(file_path: str) -> Tuple[str, str]:
+def preprocess_student_submission(file_path: str) -> Tuple[str, str, str]:
     with open(file_path, 'r') as f:
-        lines = f.readlines()
+        data = f.read()
     
     # Extract student name from the first non-empty line
-    student_name = ""
-    for line in lines:
-        line = line.strip()
-        if line:
-            student_name = re.sub(r'[^\w\s]', '', line).strip()
-            break
+    name_start = len(data) - len(data.lstrip())
+    name_end = data.find('\n', name_start)
+    name_line = data[name_start:] if name_end == -1 else data[name_start:name_end]
+    student_name = _NAME_CLEAN.sub('', name_line.strip()).strip()
     
-    # Find the index of the first "import" or "public class" statement
-    import_index = next((i for i, line in enumerate(lines) if line.strip().startswith("import")), None)
-    public_class_index = next((i for i, line in enumerate(lines) if line.strip().startswith("public class")), None)
+    # The code starts at the first line beginning with "import" or "public class"
+    code_start_match = _CODE_START.search(data)
+    code_start = code_start_match.start() if code_start_match else len(data)
     
-    # Determine the start of the code
-    code_start_index = min(filter(lambda x: x is not None, [import_index, public_class_index, len(lines)]))
-    
-    # Join all lines before the code as the header
-    student_header = ''.join(lines[:code_start_index])
+    # Everything before the code is the header
+    student_header = data[:code_start]
 
     def remove_comment_symbols(text: str) -> str:
-        text = re.sub(r'^\s*//+\s?', '', text, flags=re.MULTILINE)
-        text = re.sub(r'/\*|\*/', '', text)
-        text = re.sub(r'^\s*\*\s?', '', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*$\n', '', text, flags=re.MULTILINE)
+        text = _LINE_COMMENT.sub('', text)
+        text = _BLOCK_COMMENT_DELIMS.sub('', text)
+        text = _BLOCK_COMMENT_STAR.sub('', text)
+        text = _BLANK_LINE.sub('', text)
         return text.strip()
 
     student_header = remove_comment_symbols(student_header)
     
-    # Join all lines as the student's code
-    student_code = ''.join(lines[code_start_index:])
+    student_code = data[code_start:]
     
     processed_code = f"**HEADER:**\n{student_header}\n\n**CODE:**\n```java\n{student_code}```"
 
     # print(student_name)
     # print(processed_code)
     
-    return student_name, processed_code
+    # The raw source is returned too so the formatting check doesn't need to re-read the file
+    return student_name, processed_code, data
 
-def check_new_lines(filename):
-    with open(filename, 'r') as f:
-        lines = f.readlines()
-    
+def remove_comments_and_strings(code):
+    # Replace comments and strings with spaces to keep line numbers consistent
+    return _COMMENT_STRING_RE.sub(lambda m: ' ' * (m.end() - m.start()), code)
+
+def _line_at(code: str, index: int) -> Tuple[int, int]:
+    """Return the (start, end) offsets of the line containing code[index]."""
+    start = code.rfind('\n', 0, index) + 1
+    end = code.find('\n', index)
+    return start, len(code) if end == -1 else end
+
+_NORMAL, _LINE_COMMENT_STATE, _BLOCK_COMMENT_STATE, _STRING_STATE, _CHAR_STATE = range(5)
+
+def _scan_java_bytes(buf):
+    """
+    Byte-level state machine equivalent to stripping comments/strings and then
+    counting the lines whose braces are not in Allman style.
+
+    Returns the bracket error count, or -1 whenever the result could differ from
+    the regex path, so the caller falls back to it: a comment, string or char
+    literal that is never closed, a backslash before a newline inside a literal
+    (the regex's escape does not match a newline), or a non-ASCII or \\x1c-\\x1f
+    byte (which str.strip() treats as whitespace but this scanner does not).
+    """
+    n = len(buf)
+    state = _NORMAL
+    bracket_errors = 0
+    line_has_brace = False
+    line_chars = 0
+    i = 0
+    while i < n:
+        c = buf[i]
+        if c >= 128 or 28 <= c <= 31:
+            return -1
+        if state == _NORMAL:
+            if c == 10:  # '\n'
+                # If '{' or '}' is not alone on the line, it's not Allman style
+                if line_has_brace and line_chars > 1:
+                    bracket_errors += 1
+                line_has_brace = False
+                line_chars = 0
+            elif c == 47 and i + 1 < n and buf[i + 1] == 47:  # '//'
+                state = _LINE_COMMENT_STATE
+                i += 1
+            elif c == 47 and i + 1 < n and buf[i + 1] == 42:  # '/*'
+                state = _BLOCK_COMMENT_STATE
+                i += 1
+            elif c == 34:  # '"'
+                state = _STRING_STATE
+            elif c == 39:  # "'"
+                state = _CHAR_STATE
+            elif c != 32 and not 9 <= c <= 13:
+                line_chars += 1
+                if c == 123 or c == 125:  # '{' or '}'
+                    line_has_brace = True
+        elif state == _LINE_COMMENT_STATE:
+            if c == 10:
+                state = _NORMAL
+                continue  # Let the normal state end the line
+        elif state == _BLOCK_COMMENT_STATE:
+            if c == 42 and i + 1 < n and buf[i + 1] == 47:  # '*/'
+                state = _NORMAL
+                i += 1
+        elif state == _STRING_STATE:
+            if c == 92:  # Skip the escaped character
+                if i + 1 < n and buf[i + 1] == 10:
+                    return -1
+                i += 1
+            elif c == 34:
+                state = _NORMAL
+        else:
+            if c == 92:
+                if i + 1 < n and buf[i + 1] == 10:
+                    return -1
+                i += 1
+            elif c == 39:
+                state = _NORMAL
+        i += 1
+    if state != _NORMAL and state != _LINE_COMMENT_STATE:
+        return -1
+    if line_has_brace and line_chars > 1:
+        bracket_errors += 1
+    return bracket_errors
+
+@functools.lru_cache(maxsize=None)
+def get_bracket_scanner() -> Optional[Callable[[str], int]]:
+    """
+    Return the Numba-compiled bracket scanner, or None if numba isn't installed.
+
+    numba is imported and the kernel compiled (or loaded from numba's on-disk cache)
+    on the first call, which grade_submissions makes before grading starts.
+    """
+    try:
+        import numba
+        import numpy as np
+    except ImportError:
+        return None
+    kernel = numba.njit(cache=True)(_scan_java_bytes)
+    kernel(np.frombuffer(b'{}', dtype=np.uint8))
+    return lambda code: kernel(np.frombuffer(code.encode(), dtype=np.uint8))
+
+def check_brackets(code: str) -> int:
+    """Count the lines whose braces are not in Allman style."""
+    scanner = get_bracket_scanner()
+    if scanner is not None:
+        bracket_errors = scanner(code)
+        if bracket_errors != -1:
+            return bracket_errors
+
+    # Remove comments and strings to avoid false positives
+    code_no_comments = remove_comments_and_strings(code)
+
+    # If '{' or '}' is not alone on the line, it's not Allman style
+    bracket_errors = 0
+    checked_line_end = -1
+    for match in _BRACE_RE.finditer(code_no_comments):
+        if match.start() < checked_line_end:
+            continue  # Line already counted
+        start, checked_line_end = _line_at(code_no_comments, match.start())
+        if code_no_comments[start:checked_line_end].strip() not in ('{', '}'):
+            bracket_errors += 1
+    return bracket_errors
+
+def check_new_lines(code: str) -> bool:
     # Find the first and last print statements
     first_print = None
     last_print = None
     
-    for line in lines:
-        if line.startswith('System.out.println('):
-            if first_print is None:
-                first_print = line
-            last_print = line
+    for match in _PRINT_LINE.finditer(code):
+        if first_print is None:
+            first_print = match.group()
+        last_print = match.group()
     
     # Check if both first and last print statements exist
     if first_print is None or last_print is None:
@@ -202,54 +504,90 @@ def check_new_lines(filename):
     required_print = 'System.out.println("\\n\\n\\n");'
     return first_print != required_print + last_print != required_print
 
-import re
+def scan_formatting(code: str) -> Tuple[int, int]:
+    """
+    Run the bracket and new-line checks over the already-loaded source.
 
-def remove_comments_and_strings(code):
-    # Pattern to match comments and strings
-    pattern = r'''
-        //.*?$              |   # Line comments
-        /\*[\s\S]*?\*/      |   # Block comments
-        "(?:\\.|[^"\\])*"   |   # Double-quoted strings
-        '(?:\\.|[^'\\])*'       # Single-quoted chars
-    '''
-    regex = re.compile(pattern, re.MULTILINE | re.VERBOSE)
-    # Replace matched patterns with spaces to keep line numbers consistent
-    return regex.sub(lambda m: ' ' * (m.end() - m.start()), code)
-
-def check_brackets(filepath):
-    with open(filepath) as f:
-        code = f.read()
-    # Remove comments and strings to avoid false positives
-    code_no_comments = remove_comments_and_strings(code)
-    lines = code_no_comments.split('\n')
-    errors = 0
-    for line_num, line in enumerate(lines):
-        stripped_line = line.strip()
-        if not stripped_line:
-            continue  # Skip empty lines
-        if '{' in stripped_line or '}' in stripped_line:
-            # If the line is exactly '{' or '}', it's acceptable
-            if stripped_line == '{' or stripped_line == '}':
-                continue
-            else:
-                # If '{' or '}' is not alone on the line, it's not Allman style
-                errors += 1
-    # All braces are correctly placed in Allman style
-    return errors
+    Returns the number of lines whose braces are not in Allman style, and 1 if
+    the new-line check fails (0 otherwise).
+    """
+    return check_brackets(code), int(check_new_lines(code))
 
-def check_formatting(file_path: str, config: Dict[str, Any]) -> float:
+def formatting_deductions(bracket_errors: int, new_line_errors: int, config: Dict[str, Any]) -> float:
     deductions = 0
-    deductions += min(config["format_scoring"]["brackets"]["max"], check_brackets(file_path)*config["format_scoring"]["brackets"]["per"])
-    deductions += min(config["format_scoring"]["new_lines"]["max"], check_new_lines(file_path)*config["format_scoring"]["new_lines"]["per"])
+    deductions += min(config["format_scoring"]["brackets"]["max"], bracket_errors*config["format_scoring"]["brackets"]["per"])
+    deductions += min(config["format_scoring"]["new_lines"]["max"], new_line_errors*config["format_scoring"]["new_lines"]["per"])
     return deductions
 
-def find_student_java_files(student_code_dir: str) -> List[str]:
-    """Find all Java files in the given directory."""
-    return [os.path.join(dirpath, filename)
-            for dirpath, dirnames, filenames in os.walk(student_code_dir)
-            for filename in filenames if filename.endswith('.java')]
+def check_formatting(code: str, config: Dict[str, Any]) -> float:
+    return formatting_deductions(*scan_formatting(code), config)
 
-def grade_submissions(student_code_dir: str, assignment_pdf: str, scoring_sheet_file: str, grading_breakdown_dir: str = "GradingBreakdowns", config: Dict[str, Any] = config) -> pd.DataFrame:
+# Bump when preprocessing or the formatting checks change, so cached results from older code are ignored
+_SUBMISSION_CACHE_VERSION = 2
+
+def load_submission(file_path: str, config: Dict[str, Any]) -> Tuple[str, str, Tuple[int, int]]:
+    """
+    Preprocess a submission and scan its formatting, returning the student name, the processed
+    code and the (bracket_errors, new_line_errors) counts.
+
+    Results are memoized in the on-disk cache by path, modification time and size, so
+    re-running over unchanged files skips both steps.
+    """
+    use_cache = config.get('cache_enabled', True)
+    if use_cache:
+        st = os.stat(file_path)
+        key = ('submission', _SUBMISSION_CACHE_VERSION, os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+        cached = get_cache(config).get(key)
+        if cached is not None:
+            return cached
+
+    student_name, processed_code, raw_code = preprocess_student_submission(file_path)
+    result = (student_name, processed_code, scan_formatting(raw_code))
+    if use_cache:
+        get_cache(config).set(key, result, expire=config.get('cache_ttl', 7 * 86400))
+    return result
+
+def find_student_java_files(student_code_dir: str) -> Iterator[str]:
+    """Lazily yield all Java files in the given directory and its subdirectories."""
+    stack = [student_code_dir]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue  # Skip unreadable directories, as os.walk does
+        with entries:
+            while True:
+                try:
+                    entry = next(entries)
+                except StopIteration:
+                    break
+                except OSError:
+                    break  # os.walk also stops listing a directory on a read error
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    stack.append(entry.path)
+                elif entry.name.endswith('.java'):
+                    yield entry.path
+
+def write_breakdowns(writer_queue: "queue.Queue[Optional[Tuple[str, str]]]") -> None:
+    """Write (path, text) items from the queue to disk until a None sentinel arrives."""
+    while True:
+        item = writer_queue.get()
+        if item is None:
+            return
+        path, text = item
+        try:
+            with open(path, "w") as f:
+                f.write(text)
+        except OSError as e:
+            color_print(f"Error writing {path}: {e}", Fore.RED)
+
+def grade_submissions(student_code_dir: str, assignment_pdf: str, scoring_sheet_file: str, grading_breakdown_dir: str = "GradingBreakdowns", config: Dict[str, Any] = config,
+                      progress_callback: Optional[Callable[[int], None]] = None) -> pd.DataFrame:
     """
     Grade all student submissions in the given directory.
 
@@ -264,6 +602,8 @@ def grade_submissions(student_code_dir: str, assignment_pdf: str, scoring_sheet_
       Defaults to "GradingBreakdowns".
     - config (Dict[str, Any]): Configuration dictionary containing various settings. 
       Defaults to a pre-defined config.
+    - progress_callback (Optional[Callable[[int], None]]): Called with the total number of response
+      chunks streamed so far in this run, each time a new chunk arrives. Defaults to None.
 
     Returns:
     - pd.DataFrame: A DataFrame containing grading results with columns for student name, score, 
@@ -275,17 +615,19 @@ def grade_submissions(student_code_dir: str, assignment_pdf: str, scoring_sheet_
     3. Parses the assignment PDF to extract assignment details.
     4. Generates a system prompt for the AI grading model.
     5. Creates the grading breakdown directory if it doesn't exist.
-    6. For each Java file:
+    6. For each Java file (graded concurrently, up to config['max_concurrency'] at a time):
        - Preprocesses the student submission.
-       - Calls the AI API for grading.
+       - Calls the AI API for grading, reusing the response of an identical earlier submission
+         (same header and code).
        - Saves the AI's grading breakdown to a file.
        - Parses the AI response to extract score, comments, and confidence.
        - Applies a formatting check and adjusts the score if necessary.
        - Adds the results to a list.
+       If config['batch_mode'] is set, all submissions are instead sent as one Anthropic
+       Message Batch and the results are collected once it has finished.
     7. Returns the results as a pandas DataFrame.
 
     """
-    results = []
     java_files = find_student_java_files(student_code_dir)
     
     # Load scoring sheet
@@ -297,34 +639,119 @@ def grade_submissions(student_code_dir: str, assignment_pdf: str, scoring_sheet_
     
     os.makedirs(grading_breakdown_dir, exist_ok=True)
 
-    for java_file in tqdm(java_files, desc="Grading submissions"):
-        student_name, student_code = preprocess_student_submission(java_file)
+    # Set up the lazily-created resources once, before any worker threads race to do it
+    clients = get_clients()
+    get_cache(config)
+    get_bracket_scanner()
+
+    writer_queue: "queue.Queue[Optional[Tuple[str, str]]]" = queue.Queue()
+    writer = threading.Thread(target=write_breakdowns, args=(writer_queue,), daemon=True)
+    writer.start()
+
+    def _prompt_hash(user_prompt: str) -> str:
+        # The full header + code prompt, since the scoring sheet grades the header too
+        return hashlib.sha256(user_prompt.encode()).hexdigest()
+
+    # Identical submissions in this run share one API call, keyed by a hash of the prompt
+    seen: Dict[str, Future] = {}
+    seen_lock = threading.Lock()
+
+    chunks_received = 0
+    chunks_lock = threading.Lock()
+
+    def _on_chunk(chunk: str) -> None:
+        nonlocal chunks_received
+        # Report under the lock so counts from different pool threads arrive in order
+        with chunks_lock:
+            chunks_received += 1
+            progress_callback(chunks_received)
+
+    def _grade_code(user_prompt: str) -> str:
+        prompt_hash = _prompt_hash(user_prompt)
+        with seen_lock:
+            pending = seen.get(prompt_hash)
+            owner = pending is None
+            if owner:
+                pending = seen[prompt_hash] = Future()
+        if not owner:
+            # Wait for the submission that is already being graded
+            return pending.result()
+        try:
+            pending.set_result(call_api(clients, config['default_model'], system_prompt, user_prompt, config,
+                                        _on_chunk if progress_callback is not None else None))
+        except Exception as e:
+            pending.set_exception(e)
+        return pending.result()
+
+    def _record_result(formatting_errors: Tuple[int, int], student_name: str, ai_response: str) -> Dict[str, Any]:
+        student_name_no_spaces = student_name.replace(" ", "")
+
+        # Hand the breakdown to the writer thread so disk I/O overlaps with API calls
+        writer_queue.put((f"{config['grading_breakdown_folder']}/{student_name_no_spaces}-GradingBreakdown.txt", ai_response))
+        
+        score, comments, confidence = parse_ai_response(ai_response)
+        
+        score -= formatting_deductions(*formatting_errors, config)
+        
+        return {
+            "Name": student_name,
+            "Score": score,
+            "Confidence": confidence,
+            "Comments": comments
+        }
+
+    def _grade_one(java_file: str) -> Optional[Dict[str, Any]]:
+        try:
+            student_name, student_code, formatting_errors = load_submission(java_file, config)
+        except Exception as e:
+            # e.g. a file that isn't valid text; skip it rather than failing the whole run
+            color_print(f"Error reading {java_file}: {str(e)}", Fore.RED)
+            return None
 
         user_prompt = student_code
         
         try:
-            ai_response = call_api(clients, config['default_model'], system_prompt, user_prompt, config)
-            
-            student_name_no_spaces = student_name.replace(" ", "")
-
-            with open(f"{config['grading_breakdown_folder']}/{student_name_no_spaces}-GradingBreakdown.txt", "w") as f:
-                f.write(ai_response)
-            
-            score, comments, confidence = parse_ai_response(ai_response)
-            
-            score -= check_formatting(java_file, config)
-            
-            results.append({
-                "Name": student_name,
-                "Score": score,
-                "Confidence": confidence,
-                "Comments": comments
-            })
-            
+            return _record_result(formatting_errors, student_name, _grade_code(user_prompt))
         except Exception as e:
             color_print(f"Error grading {student_name}: {str(e)}", Fore.RED)
-    
-    return pd.DataFrame(results)
+            return None
+
+    try:
+        if config.get('batch_mode'):
+            # Collect every submission first, then grade them all in one asynchronous batch
+            submissions = []
+            for java_file in java_files:
+                try:
+                    submissions.append(load_submission(java_file, config))
+                except Exception as e:
+                    color_print(f"Error reading {java_file}: {str(e)}", Fore.RED)
+            # The sha256 hex digest doubles as a valid batch custom id, and only exact duplicates share one
+            prompts = {_prompt_hash(user_prompt): user_prompt for _, user_prompt, _ in submissions}
+            responses = call_api_batch(clients, config['default_model'], system_prompt, prompts, config)
+            results = []
+            for student_name, user_prompt, formatting_errors in tqdm(submissions, desc="Grading submissions"):
+                try:
+                    ai_response = responses.get(_prompt_hash(user_prompt))
+                    if ai_response is None:
+                        raise RuntimeError("no successful response in the batch")
+                    results.append(_record_result(formatting_errors, student_name, ai_response))
+                except Exception as e:
+                    color_print(f"Error grading {student_name}: {str(e)}", Fore.RED)
+        else:
+            # Each grading is an independent API call, so overlap the network round-trips
+            with ThreadPoolExecutor(max_workers=config.get('max_concurrency', 8)) as executor:
+                # Submissions start grading as soon as they are discovered
+                futures = {executor.submit(_grade_one, java_file): i for i, java_file in enumerate(java_files)}
+                # Slot each result by discovery order so the output doesn't depend on completion order
+                results = [None] * len(futures)
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Grading submissions"):
+                    results[futures[future]] = future.result()
+    finally:
+        # Flush the remaining breakdowns even if grading was interrupted
+        writer_queue.put(None)
+        writer.join()
+
+    return pd.DataFrame.from_records([r for r in results if r is not None], columns=RESULT_COLUMNS)
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="AI Grader for Java Programming Class")
@@ -5,6 +5,7 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QH
                              QPushButton, QFileDialog, QLabel, QProgressBar, QMessageBox, 
                              QComboBox, QLineEdit, QGroupBox, QFormLayout, QTableView)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QAbstractTableModel
+import numpy as np
 import pandas as pd
 from grader import grade_submissions
 
@@ -12,6 +13,10 @@ class PandasModel(QAbstractTableModel):
     def __init__(self, data):
         super().__init__()
         self._data = data
+        # Plain ndarray indexing is much cheaper than iloc, and each cell's string is
+        # built lazily on first paint and reused on every repaint after that
+        self._values = data.values.astype(object)
+        self._strings = np.empty(self._values.shape, dtype=object)
 
     def rowCount(self, parent=None):
         return self._data.shape[0]
@@ -22,7 +27,11 @@ class PandasModel(QAbstractTableModel):
     def data(self, index, role=Qt.DisplayRole):
         if index.isValid():
             if role == Qt.DisplayRole:
-                return str(self._data.iloc[index.row(), index.column()])
+                row, col = index.row(), index.column()
+                text = self._strings[row, col]
+                if text is None:
+                    text = self._strings[row, col] = str(self._values[row, col])
+                return text
         return None
 
     def headerData(self, col, orientation, role):
@@ -33,6 +42,7 @@ class PandasModel(QAbstractTableModel):
 class GradingThread(QThread):
     finished = pyqtSignal(pd.DataFrame)
     error = pyqtSignal(str)
+    progress = pyqtSignal(int)
 
     def __init__(self, student_code_dir, assignment_pdf, scoring_sheet_file, grading_breakdown_dir, config):
         super().__init__()
@@ -49,7 +59,8 @@ class GradingThread(QThread):
                 self.assignment_pdf,
                 self.scoring_sheet_file,
                 self.grading_breakdown_dir,
-                self.config
+                self.config,
+                self.progress.emit
             )
             self.finished.emit(result)
         except Exception as e:
@@ -111,6 +122,16 @@ class MainWindow(QMainWindow):
         self.grade_btn.clicked.connect(self.start_grading)
         self.layout.addWidget(self.grade_btn)
 
+        # Grading progress
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+        self.progress_label = QLabel("")
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.progress_label)
+        self.layout.addLayout(progress_layout)
+
         # Results display
         self.results_table = QTableView()
         self.layout.addWidget(self.results_table, 1)
@@ -178,19 +199,33 @@ class MainWindow(QMainWindow):
         )
         self.grading_thread.finished.connect(self.display_results)
         self.grading_thread.error.connect(self.show_error)
+        self.grading_thread.progress.connect(self.update_progress)
+        # Busy indicator until grading finishes, with a live count of streamed response chunks
+        self.progress_bar.setRange(0, 0)
+        self.progress_label.setText("Waiting for responses...")
         self.grading_thread.start()
 
+    def update_progress(self, chunks_received):
+        # Each streamed chunk may hold several tokens, and chunks from retried calls are counted too
+        self.progress_label.setText(f"{chunks_received} response chunks received")
+
+    def stop_progress(self, done):
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(1 if done else 0)
+
     def display_results(self, results_df):
         self.results_df = results_df
         model = PandasModel(results_df)
         self.results_table.setModel(model)
         self.results_table.resizeColumnsToContents()
+        self.stop_progress(True)
         self.grade_btn.setEnabled(True)
         self.export_btn.setEnabled(True)
         QMessageBox.information(self, "Grading Complete", "The grading process has finished successfully.")
 
     def show_error(self, error_message):
         QMessageBox.critical(self, "Error", f"An error occurred during grading: {error_message}")
+        self.stop_progress(False)
         self.grade_btn.setEnabled(True)
 
     def export_results(self):